@@ -0,0 +1,60 @@
+"""
+Compare payment amount summaries in mode=fixed against the default float mode.
+
+Both time PaymentAmountView.calculate(..., summary=True), the code a request
+runs. The float path is closed form, while fixed mode walks the schedule in
+integer cents, so the check is that fixed mode stays within MAX_RATIO of it.
+The script exits with an error when it doesn't.
+
+Usage:
+    python benchmarks/fixed_point.py [number] [repeat]
+"""
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mortgage_calculator.settings")
+
+import django
+django.setup()
+
+from calculator.views.payment_amount import PaymentAmountView
+
+# fixed mode may take at most this many times as long as float mode
+MAX_RATIO = 15
+
+# (downpayment, askingprice, paymentschedule, amortizationperiod), the longest schedules first
+SCENARIOS = [
+    (80000, 500000, 'weekly', 25),
+    (25000, 500000, 'biweekly', 25),
+    (100000, 350000, 'monthly', 15),
+    (40000, 350000, 'monthly', 5),
+]
+
+
+def summary(scenario, mode):
+    return PaymentAmountView(0.025).calculate(*scenario, summary=True, mode=mode)
+
+
+def main(number=200, repeat=5):
+    worst = 0
+    for scenario in SCENARIOS:
+        float_time = min(timeit.repeat(lambda: summary(scenario, 'float'), number=number, repeat=repeat)) / number
+        fixed_time = min(timeit.repeat(lambda: summary(scenario, 'fixed'), number=number, repeat=repeat)) / number
+        ratio = fixed_time / float_time
+        worst = max(worst, ratio)
+
+        gap = abs(Decimal(summary(scenario, 'fixed')['total_interest']) -
+                  Decimal(repr(summary(scenario, 'float')['total_interest'])))
+        print("{:<32} float {:>8.1f}us  fixed {:>8.1f}us  {:>5.1f}x  interest gap ${:.2f}".format(
+            '{} {} {} {}y'.format(*scenario), float_time * 1e6, fixed_time * 1e6, ratio, gap))
+
+    print("worst fixed / float: {:.1f}x (limit {}x)".format(worst, MAX_RATIO))
+    if worst > MAX_RATIO:
+        sys.exit("fixed mode is more than {}x slower than float mode".format(MAX_RATIO))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,78 @@
+"""
+Check that the pre-encoded responses are byte compatible with JsonResponse, and time both.
+
+Usage:
+    python benchmarks/rendering.py [number]
+"""
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mortgage_calculator.settings")
+
+import django
+django.setup()
+
+from django.http import JsonResponse
+from calculator.rendering import render_success, render_error
+
+PAYMENT_PARAMS = {'askingprice': 500000.0, 'downpayment': 80000.0, 'paymentschedule': 'weekly', 'amortizationperiod': 15.0}
+
+# (operation, params, result, is error) as the views produce them
+SAMPLES = [
+    ("Payment Amount", PAYMENT_PARAMS, 655.0018382403105, False),
+    ("Payment Amount", dict(PAYMENT_PARAMS, summary=True), {
+        'total_interest': 85306.4393421631, 'interest_by_year': [10336.39, 10051.1, 1e-05],
+        'renewal_balance': 302442.32208133064, 'payment': 655.0018382403105, 'total_insurance': 7560.0}, False),
+    ("Payment Amount", dict(PAYMENT_PARAMS, mode='fixed'), '655.00', False),
+    ("Payment Amount", {}, ["downpayment too low for askingprice. Must be at least $25000.0"], True),
+    ("Mortgage Amount", {'paymentamount': 1500.0, 'downpayment': 0.0, 'paymentschedule': 'biweekly',
+                         'amortizationperiod': 5.0}, 271972.13, False),
+    ("Mortgage Amount", {}, ["missing parameter 'paymentamount'", "missing parameter 'amortizationperiod'"], True),
+    ("Interest Rate", {'interestrate': '0.0500000'}, {'old_rate': str(Decimal('0.025')), 'new_rate': '0.0500000'}, False),
+    ("Interest Rate", {}, ["interestrate must be a number"], True),
+    ("Schedule Comparison", {'askingprice': 1e16, 'downpayment': -0.0, 'amortizationperiod': 25.0}, {
+        'weekly': {'payment': float('nan'), 'total_interest': float('inf'), 'payments': 1305, 'payoff_years': 25.0}}, False),
+    ("Payment Amount", {'note': 'café "quoted"\n'}, [Decimal('1.10'), None, True], True),
+]
+
+
+def json_response(operation, params, result, error):
+    if error:
+        response = JsonResponse({'result': 'error', 'request': operation, 'request_params': params, 'errors': result})
+        response.status_code = 400
+        return response
+    return JsonResponse({'result': 'success', 'request': operation, 'request_params': params, 'response': result})
+
+
+def rendered(operation, params, result, error):
+    if error:
+        return render_error(operation, params, result)
+    return render_success(operation, params, result)
+
+
+def main(number=20000):
+    mismatches = 0
+    for sample in SAMPLES:
+        expected = json_response(*sample)
+        actual = rendered(*sample)
+        same = (expected.content == actual.content and expected.status_code == actual.status_code and
+                expected['Content-Type'] == actual['Content-Type'])
+        if not same:
+            mismatches += 1
+            print("MISMATCH {}:\n  {!r}\n  {!r}".format(sample[0], expected.content, actual.content))
+    print("byte compatible:  {}/{}".format(len(SAMPLES) - mismatches, len(SAMPLES)))
+
+    old_time = min(timeit.repeat(lambda: [json_response(*sample) for sample in SAMPLES], number=number // 10, repeat=3))
+    new_time = min(timeit.repeat(lambda: [rendered(*sample) for sample in SAMPLES], number=number // 10, repeat=3))
+    per_response = 1e6 / (number // 10 * len(SAMPLES))
+    print("JsonResponse:     {:.2f}us per response".format(old_time * per_response))
+    print("pre-encoded:      {:.2f}us per response".format(new_time * per_response))
+    print("speedup:          {:.2f}x".format(old_time / new_time))
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(*[int(arg) for arg in sys.argv[1:]]) else 0)
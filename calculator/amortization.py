@@ -0,0 +1,118 @@
+import numpy as np
+from calculator.rules import get_rules
+
+# Natural rate of weeks per year
+WEEKS_PER_YEAR = 52.177457
+
+# Number of scheduled payments in one year, by payment schedule
+PAYMENTS_PER_YEAR = {
+    'weekly': WEEKS_PER_YEAR,
+    'biweekly': WEEKS_PER_YEAR / 2,
+    'monthly': 12,
+}
+
+# Number the annual rate is divided by to get the rate per payment, for
+# the payment amount and mortgage amount endpoints (and the solvers that
+# invert them). Biweekly divides by twice the weeks per year, as these
+# endpoints always have. /schedule-comparison uses PAYMENTS_PER_YEAR instead.
+RATE_PERIODS_PER_YEAR = {
+    'weekly': WEEKS_PER_YEAR,
+    'biweekly': WEEKS_PER_YEAR * 2,
+    'monthly': 12,
+}
+
+# The same, written out exactly for fixed point calculations
+EXACT_RATE_PERIODS_PER_YEAR = {
+    'weekly': '52.177457',
+    'biweekly': '104.354914',
+    'monthly': '12',
+}
+
+
+def minimum_down_payment(askingprice):
+    # 5% of the asking price, plus 10% of any amount above $500k (see calculator.rules)
+    return get_rules().minimum_down_payment(askingprice)
+
+
+def insurance_rate(downpayment, askingprice):
+    # Mortgage insurance, as a fraction of the mortgage principal (see calculator.rules)
+    return get_rules().insurance_rate(downpayment, askingprice)
+
+
+def level_payment(principal, rate_per_period, payments):
+    # payment formula: P = L[c(1 + c)^n]/[(1 + c)^n - 1]
+    # Works element-wise on arrays; a zero rate degrades to L / n.
+    L = np.asarray(principal, dtype=float)
+    c = np.asarray(rate_per_period, dtype=float)
+    n = np.asarray(payments, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + c) ** n
+        payment = L * (c * growth) / (growth - 1)
+    return np.where(c == 0, L / n, payment)
+
+
+def balance_after(principal, rate_per_period, payment, periods):
+    # Balance remaining after `periods` payments: B = L(1 + c)^k - P[(1 + c)^k - 1]/c
+    L = np.asarray(principal, dtype=float)
+    c = np.asarray(rate_per_period, dtype=float)
+    P = np.asarray(payment, dtype=float)
+    k = np.asarray(periods, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + c) ** k
+        balance = L * growth - P * (growth - 1) / c
+    return np.where(c == 0, L - P * k, balance)
+
+
+def payoff_periods(principal, rate_per_period, payment):
+    # Number of payments (possibly fractional) needed to clear the principal:
+    #   n = -log(1 - cL/P) / log(1 + c)
+    # Payments that never cover the interest give infinity.
+    L = np.asarray(principal, dtype=float)
+    c = np.asarray(rate_per_period, dtype=float)
+    P = np.asarray(payment, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = -np.log1p(-c * L / P) / np.log1p(c)
+    n = np.where(c * L >= P, np.inf, n)
+    return np.where(c == 0, L / P, n)
+
+
+def payoff_summary(principal, rate_per_period, payment):
+    # Return:
+    #   (whole number of payments, total interest paid)
+    # The last payment only covers what is left of the balance.
+    exact = payoff_periods(principal, rate_per_period, payment)
+    # absorb floating point error so a fully amortized schedule isn't given an extra payment
+    periods = np.ceil(exact - 1e-6)
+    c = np.asarray(rate_per_period, dtype=float)
+    last_payment = balance_after(principal, rate_per_period, payment, periods - 1) * (1 + c)
+    total_paid = payment * (periods - 1) + last_payment
+    return periods, total_paid - principal
+
+
+# Years into the mortgage at which the term is renewed
+RENEWAL_TERM = 5
+
+
+def interest_by_year(principal, rate_per_period, payment, payments, payments_per_year):
+    # Interest paid in each year of the mortgage, without walking the schedule.
+    # Payment k falls in year ceil(k / payments_per_year), so year y ends after
+    # payment floor(y * payments_per_year). Between two boundaries a and b:
+    #   interest = P(b - a) - (B_a - B_b)
+    years = int(np.ceil(payments / payments_per_year))
+    boundaries = np.floor(np.arange(years + 1) * payments_per_year)
+    boundaries = np.minimum(boundaries, payments)
+    balances = balance_after(principal, rate_per_period, payment, boundaries)
+    return payment * np.diff(boundaries) + np.diff(balances)
+
+
+def loan_summary(principal, rate_per_period, payment, payments, payments_per_year):
+    # Return:
+    #   total interest, interest paid per year, and the balance at renewal
+    renewal_period = min(round(RENEWAL_TERM * payments_per_year), payments)
+    renewal_balance = balance_after(principal, rate_per_period, payment, renewal_period)
+    return {
+        'total_interest': float(payment * payments - principal),
+        'interest_by_year': [float(interest) for interest in
+                             interest_by_year(principal, rate_per_period, payment, payments, payments_per_year)],
+        'renewal_balance': max(float(renewal_balance), 0.0),
+    }
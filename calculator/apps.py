@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 
 
 class CalculatorConfig(AppConfig):
     name = 'calculator'
+
+    def ready(self):
+        # load the lending rules at startup, so a bad table fails fast
+        from calculator.rules import get_rules
+        get_rules()
+
+        from calculator.coalescing import rate_changed
+        from calculator.models import InterestRate
+        post_save.connect(rate_changed, sender=InterestRate)
+        post_delete.connect(rate_changed, sender=InterestRate)
@@ -0,0 +1,91 @@
+import functools
+import threading
+from django.http import HttpResponse
+
+
+class SingleFlight:
+    # Runs at most one call per key at a time.
+    # Callers that arrive with the same key while a call is in flight wait for
+    # it and share its result (or its exception) instead of repeating the work.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.in_flight[key] = call
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        # Return:
+        #   number of calls made, and of callers that shared another's call
+        with self.lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+flights = SingleFlight()
+
+# Bumped whenever an interest rate is saved or deleted in this process, so
+# requests made after a rate change never share a result computed before it.
+rate_version = 0
+
+
+def rate_changed(**kwargs):
+    global rate_version
+    rate_version += 1
+
+
+def canonical_params(query):
+    # Parameter order and case don't change any view's result.
+    return tuple(sorted((key, tuple(value.lower() for value in values)) for key, values in query.lists()))
+
+
+def coalesce(view):
+    # Shares one computation between identical concurrent GET requests.
+    # Each request gets its own copy of the serialized response.
+    @functools.wraps(view)
+    def wrapper(request):
+        if request.method != 'GET':
+            return view(request)
+
+        key = (view.__module__, request.path, canonical_params(request.GET), rate_version)
+
+        def render():
+            response = view(request)
+            return response.content, response.status_code, response['Content-Type']
+
+        content, status, content_type = flights.do(key, render)
+        return HttpResponse(content, status=status, content_type=content_type)
+    return wrapper
@@ -0,0 +1,149 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from fractions import Fraction
+import math
+import numpy as np
+
+# Money is held in integer cents, and rates as integers scaled by RATE_SCALE.
+# RATE_SCALE matches the 7 decimal places stored in InterestRate.rate, so a
+# stored rate converts without any loss.
+CENTS = 100
+RATE_SCALE = 10 ** 7
+INT64_MAX = 2 ** 63 - 1
+
+
+def to_cents(amount):
+    # dollars (str, float or Decimal) to integer cents, rounding half to even
+    return int((Decimal(str(amount)) * CENTS).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def from_cents(cents):
+    # integer cents to an exact Decimal amount of dollars
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def to_fixed_rate(rate):
+    # rate (str, float or Decimal) to an integer scaled by RATE_SCALE
+    return int((Decimal(str(rate)) * RATE_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def period_rate(fixed_rate, periods_per_year):
+    # Return:
+    #   (numerator, denominator) of the rate per period, in lowest terms.
+    # periods_per_year may be fractional (e.g. '52.177457'); pass it as a str
+    # or Decimal so it is read exactly.
+    rate = Fraction(fixed_rate, RATE_SCALE) / Fraction(str(periods_per_year))
+    return rate.numerator, rate.denominator
+
+
+def fits_int64(principal, rate_numerator):
+    # Whether balance * rate_numerator stays within an int64 for every loan in a batch.
+    # Balances never rise above the principal, so the principal bounds the product.
+    largest = int(np.max(np.abs(principal))) * int(np.max(np.abs(rate_numerator)))
+    return largest <= INT64_MAX
+
+
+def divide_half_even(numerator, denominator):
+    # Integer division rounded half to even ("bankers' rounding"), element-wise.
+    # Python ints are divided exactly, whatever their size. denominator must be positive.
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def amortize(principal, rate_numerator, rate_denominator, payment, payments, renewal_period=None):
+    # Walk a batch of schedules in integer cents, one period at a time for every loan at once.
+    # Each period's interest is rounded half to even, and the final payment clears
+    # whatever balance is left.
+    #
+    # All arguments are int64 arrays (or scalars) of cents, per period rate
+    # fractions and payment counts. balance * rate_numerator must fit in an int64
+    # (see fits_int64); OverflowError is raised for batches where it doesn't.
+    #
+    # Return:
+    #   dict of int64 arrays: final_payment, total_interest, and renewal_balance
+    #   (the balance after renewal_period payments, when given)
+    if not fits_int64(principal, rate_numerator):
+        raise OverflowError("balance * rate_numerator doesn't fit in an int64")
+    principal = np.asarray(principal, dtype=np.int64)
+    rate_numerator = np.asarray(rate_numerator, dtype=np.int64)
+    rate_denominator = np.asarray(rate_denominator, dtype=np.int64)
+    payment = np.asarray(payment, dtype=np.int64)
+    payments = np.asarray(payments, dtype=np.int64)
+    shape = np.broadcast(principal, rate_numerator, rate_denominator, payment, payments).shape
+
+    balance = np.broadcast_to(principal, shape).copy()
+    total_interest = np.zeros(shape, dtype=np.int64)
+    final_payment = np.zeros(shape, dtype=np.int64)
+    renewal_balance = np.zeros(shape, dtype=np.int64)
+    if renewal_period is not None:
+        renewal_period = np.minimum(np.asarray(renewal_period, dtype=np.int64), payments)
+
+    for period in range(1, int(np.max(payments)) + 1):
+        active = period <= payments
+        interest = divide_half_even(balance * rate_numerator, rate_denominator)
+        last = period == payments
+        paid = np.where(last, balance + interest, payment)
+        final_payment = np.where(last, paid, final_payment)
+        balance = np.where(active, balance + interest - paid, balance)
+        total_interest += np.where(active, interest, 0)
+        if renewal_period is not None:
+            renewal_balance = np.where(period == renewal_period, balance, renewal_balance)
+
+    result = {
+        'final_payment': final_payment,
+        'total_interest': total_interest,
+    }
+    if renewal_period is not None:
+        result['renewal_balance'] = renewal_balance
+    return result
+
+
+def amortize_loan(principal, rate_numerator, rate_denominator, payment, payments, payments_per_year,
+                  renewal_period=None):
+    # The same walk as amortize() for a single loan, in plain Python ints.
+    # Numpy calls on 0-d arrays cost far more than the arithmetic for one loan,
+    # so requests use this and batches use amortize().
+    # Interest is also totalled by year. Year y ends after payment
+    # floor(y * payments_per_year), as in amortization.interest_by_year.
+    #
+    # Return:
+    #   dict of ints: final_payment, total_interest, interest_by_year (list) and
+    #   renewal_balance (when renewal_period is given)
+    years = math.ceil(payments / payments_per_year)
+    year_ends = [min(math.floor(year * payments_per_year), payments) for year in range(1, years + 1)]
+
+    balance = principal
+    total_interest = 0
+    interest_by_year = []
+    year_interest = 0
+    next_year = 0
+    final_payment = 0
+    renewal_balance = 0
+    for period in range(1, payments + 1):
+        # divide_half_even, inlined
+        interest, remainder = divmod(balance * rate_numerator, rate_denominator)
+        if 2 * remainder > rate_denominator or (2 * remainder == rate_denominator and interest % 2 == 1):
+            interest += 1
+        if period == payments:
+            final_payment = balance + interest
+            balance = 0
+        else:
+            balance += interest - payment
+        total_interest += interest
+        year_interest += interest
+        while next_year < years and period == year_ends[next_year]:
+            interest_by_year.append(year_interest)
+            year_interest = 0
+            next_year += 1
+        if period == renewal_period:
+            renewal_balance = balance
+
+    result = {
+        'final_payment': final_payment,
+        'total_interest': total_interest,
+        'interest_by_year': interest_by_year,
+    }
+    if renewal_period is not None:
+        result['renewal_balance'] = renewal_balance
+    return result
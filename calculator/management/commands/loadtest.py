@@ -0,0 +1,378 @@
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from calculator import coalescing
+from calculator.amortization import minimum_down_payment
+from calculator.coalescing import flights
+from calculator.models import InterestRate
+
+# name: (method, path)
+ENDPOINTS = {
+    'payment': ('GET', '/payment-amount'),
+    'mortgage': ('GET', '/mortgage-amount'),
+    'rate': ('PATCH', '/interest-rate'),
+    'comparison': ('GET', '/schedule-comparison'),
+}
+DEFAULT_MIX = 'payment=70,mortgage=25,rate=5'
+SCHEDULES = ('weekly', 'biweekly', 'monthly')
+
+# length of a (masked) CSRF token, as Django's CsrfViewMiddleware expects
+CSRF_TOKEN_LENGTH = 64
+
+# one popular scenario, as when a marketing page goes live
+HOT_PARAMS = {
+    'payment': {'askingprice': '500000', 'downpayment': '50000', 'paymentschedule': 'monthly',
+                'amortizationperiod': '25'},
+    'mortgage': {'paymentamount': '2000', 'paymentschedule': 'monthly', 'amortizationperiod': '25'},
+    'comparison': {'askingprice': '500000', 'downpayment': '50000', 'amortizationperiod': '25'},
+}
+
+
+def percentile(ordered, fraction):
+    # nearest rank percentile of an already sorted list
+    if not ordered:
+        return None
+    rank = int(math.ceil(fraction * len(ordered) - 1e-9))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'mean_ms': 1000 * sum(ordered) / len(ordered) if ordered else None,
+        'p50_ms': 1000 * percentile(ordered, 0.50) if ordered else None,
+        'p95_ms': 1000 * percentile(ordered, 0.95) if ordered else None,
+        'p99_ms': 1000 * percentile(ordered, 0.99) if ordered else None,
+        'max_ms': 1000 * ordered[-1] if ordered else None,
+    }
+
+
+def milliseconds(value):
+    return 'n/a' if value is None else '{:.2f}ms'.format(value)
+
+
+def percentiles(summary):
+    return 'p50 {}  p95 {}  p99 {}'.format(
+        milliseconds(summary['p50_ms']), milliseconds(summary['p95_ms']), milliseconds(summary['p99_ms']))
+
+
+class QueryTimer:
+    # Times every query run on a connection (see connection.execute_wrapper).
+    # Write time covers INSERT/UPDATE/DELETE statements: their execution,
+    # plus any wait for a write lock. It is not a measure of lock waits alone.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.query_time = 0.0
+        self.write_time = 0.0
+        self.locked_errors = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception as error:
+            if 'locked' in str(error):
+                with self.lock:
+                    self.locked_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            is_write = sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE')
+            with self.lock:
+                self.query_time += elapsed
+                if is_write:
+                    self.write_time += elapsed
+
+
+class Command(BaseCommand):
+    help = ("Drive a mix of concurrent GET and PATCH requests at the calculator and report throughput, "
+            "latency percentiles and database time. Runs the app in-process, against a throwaway database, "
+            "unless --url is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help="base URL of a running server, e.g. http://127.0.0.1:8000 (default: in-process). "
+                                 "PATCH requests carry a matching CSRF cookie and header, and add rows to that "
+                                 "server's database.")
+        parser.add_argument('--concurrency', type=int, default=10, help="requests in flight at once")
+        parser.add_argument('--requests', type=int, default=1000, help="total number of requests")
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help="relative weights of {} (default: {})".format(', '.join(ENDPOINTS), DEFAULT_MIX))
+        parser.add_argument('--hot-fraction', type=float, default=0.2,
+                            help="fraction of GET requests repeating one popular scenario")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--timeout', type=float, default=30, help="per request timeout against --url, in seconds")
+        parser.add_argument('--output', default=None, help="write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1")
+        mix = self.parse_mix(options['mix'])
+        generator = random.Random(options['seed'])
+        # PATCHes resubmit the current rate, so the load test doesn't change any results
+        self.patch_rate = str(InterestRate.get_rate_at_time(timezone.now()))
+        plan = [self.make_request(generator, mix, options['hot_fraction']) for i in range(options['requests'])]
+
+        if options['url']:
+            self.base_url = options['url'].rstrip('/')
+            self.timeout = options['timeout']
+            # any well formed token passes, as long as the cookie and header agree
+            self.csrf_token = get_random_string(CSRF_TOKEN_LENGTH)
+            self.timer = None
+            results, elapsed = self.run(plan, options['concurrency'], self.send_http)
+        else:
+            with self.scratch_database():
+                # start from the configured database's current rate, so results are the same
+                InterestRate.objects.create(rate=self.patch_rate)
+                self.clients = threading.local()
+                self.timer = QueryTimer()
+                flights_before = flights.stats()
+                version_before = coalescing.rate_version
+                # the test client's host has to be allowed to reach the views
+                with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+                    results, elapsed = self.run(plan, options['concurrency'], self.send_in_process,
+                                                teardown=self.close_connections)
+                flights_after = flights.stats()
+                rate_changes = coalescing.rate_version - version_before
+
+        report = self.report(results, elapsed, options, mix)
+        if not options['url']:
+            report['coalescing'] = {key: flights_after[key] - flights_before[key] for key in flights_after}
+            # every saved rate stops later requests sharing earlier results, so PATCHes lower these counts
+            report['coalescing']['rate_changes'] = rate_changes
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write("results written to {}".format(options['output']))
+
+    @contextmanager
+    def scratch_database(self):
+        # In-process PATCHes save InterestRate rows, so the run gets a freshly
+        # migrated database of its own, destroyed afterwards. An in-memory SQLite
+        # database (as under the test runner) is already throwaway and is used as is.
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            yield
+            return
+
+        test_settings = connection.settings_dict['TEST']
+        test_name = test_settings['NAME']
+        directory = None
+        if connection.vendor == 'sqlite' and not test_name:
+            # a file rather than the default in-memory database, so worker
+            # threads lock it the same way as the configured database
+            directory = tempfile.mkdtemp(prefix='loadtest-')
+            test_settings['NAME'] = os.path.join(directory, 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = test_name
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def parse_mix(self, text):
+        mix = {}
+        try:
+            for part in text.split(','):
+                name, weight = part.split('=')
+                mix[name.strip()] = float(weight)
+        except ValueError:
+            raise CommandError("--mix must look like '{}'".format(DEFAULT_MIX))
+        unknown = set(mix) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError("unknown endpoints in --mix: {}".format(', '.join(sorted(unknown))))
+        if sum(mix.values()) <= 0:
+            raise CommandError("--mix needs a positive weight")
+        return mix
+
+    def make_request(self, generator, mix, hot_fraction):
+        # Return:
+        #   (endpoint name, method, path, query string or body)
+        name = generator.choices(list(mix), weights=list(mix.values()))[0]
+        method, path = ENDPOINTS[name]
+        if method == 'PATCH':
+            return name, method, path, json.dumps({'interestrate': self.patch_rate})
+        if generator.random() < hot_fraction:
+            return name, method, path, urlencode(HOT_PARAMS[name])
+
+        asking_price = generator.randrange(150000, 1500000, 1000)
+        down_payment = max(minimum_down_payment(asking_price), asking_price * generator.uniform(0.05, 0.35))
+        schedule = generator.choice(SCHEDULES)
+        period = generator.randint(5, 25)
+        if name == 'payment':
+            params = {'askingprice': asking_price, 'downpayment': round(down_payment), 'paymentschedule': schedule,
+                      'amortizationperiod': period}
+        elif name == 'comparison':
+            params = {'askingprice': asking_price, 'downpayment': round(down_payment), 'amortizationperiod': period}
+        else:
+            params = {'paymentamount': generator.randrange(500, 6000, 50), 'paymentschedule': schedule,
+                      'amortizationperiod': period}
+            if generator.random() < 0.5:
+                params['downpayment'] = generator.randrange(0, 200000, 5000)
+        return name, method, path, urlencode(params)
+
+    def run(self, plan, concurrency, send, teardown=None):
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            start = time.perf_counter()
+            results = loop.run_until_complete(self.drive(loop, executor, plan, concurrency, send))
+            elapsed = time.perf_counter() - start
+        finally:
+            if teardown is not None:
+                teardown(executor, concurrency)
+            executor.shutdown(wait=True)
+            loop.close()
+        return results, elapsed
+
+    def close_connections(self, executor, concurrency):
+        # Each worker thread opened its own database connection, and only that
+        # thread may close it. The barrier holds every task until all have
+        # started, so each one runs on a different worker thread.
+        barrier = threading.Barrier(concurrency)
+
+        def close():
+            connections.close_all()
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+
+        for future in [executor.submit(close) for i in range(concurrency)]:
+            future.result()
+
+    async def drive(self, loop, executor, plan, concurrency, send):
+        queue = asyncio.Queue()
+        for item in plan:
+            queue.put_nowait(item)
+        results = []
+
+        async def worker():
+            while not queue.empty():
+                name, method, path, payload = queue.get_nowait()
+                start = time.perf_counter()
+                status = await loop.run_in_executor(executor, send, method, path, payload)
+                results.append((name, status, time.perf_counter() - start))
+
+        await asyncio.gather(*[worker() for i in range(concurrency)])
+        return results
+
+    def send_in_process(self, method, path, payload):
+        # one client per thread; queries are timed on this thread's connection
+        client = getattr(self.clients, 'client', None)
+        if client is None:
+            client = self.clients.client = Client()
+        with connection.execute_wrapper(self.timer):
+            if method == 'GET':
+                response = client.get(path + '?' + payload)
+            else:
+                response = client.generic(method, path, payload, content_type='application/json')
+        return response.status_code
+
+    def send_http(self, method, path, payload):
+        if method == 'GET':
+            request = Request(self.base_url + path + '?' + payload, method=method)
+        else:
+            # CSRF_HEADER_NAME is the request.META key, e.g. HTTP_X_CSRFTOKEN for X-CSRFToken
+            csrf_header = settings.CSRF_HEADER_NAME[len('HTTP_'):].replace('_', '-')
+            request = Request(self.base_url + path, data=payload.encode('utf-8'), method=method, headers={
+                'Content-Type': 'application/json',
+                'Cookie': '{}={}'.format(settings.CSRF_COOKIE_NAME, self.csrf_token),
+                csrf_header: self.csrf_token,
+                # checked over HTTPS only
+                'Referer': self.base_url + '/',
+            })
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            return error.code
+        except Exception:
+            # connection errors and timeouts
+            return 0
+
+    def report(self, results, elapsed, options, mix):
+        # Latencies only cover successful (2xx) responses. Rejected requests,
+        # timeouts and connection errors (status 0) are counted under status.
+        successes = [(name, latency) for name, status, latency in results if 200 <= status < 300]
+        endpoints = {}
+        for name in sorted(set(name for name, status, latency in results)):
+            endpoints[name] = latency_summary([latency for n, latency in successes if n == name])
+            endpoints[name]['status'] = dict(Counter(str(status) for n, status, l in results if n == name))
+            endpoints[name]['failed'] = sum(1 for n, status, l in results if n == name and not 200 <= status < 300)
+
+        report = {
+            'config': {
+                'target': options['url'] or 'in-process',
+                'database': settings.DATABASES['default']['ENGINE'],
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'mix': mix,
+                'hot_fraction': options['hot_fraction'],
+                'seed': options['seed'],
+            },
+            'elapsed_s': elapsed,
+            'throughput_rps': len(results) / elapsed if elapsed else None,
+            'successful_rps': len(successes) / elapsed if elapsed else None,
+            'latency': latency_summary([latency for name, latency in successes]),
+            'status': dict(Counter(str(status) for name, status, latency in results)),
+            'failed': len(results) - len(successes),
+            'endpoints': endpoints,
+            # database time is only visible when the app runs in-process
+            'database': None,
+        }
+        if self.timer is not None:
+            report['database'] = {
+                'query_time_s': self.timer.query_time,
+                'write_time_s': self.timer.write_time,
+                'locked_errors': self.timer.locked_errors,
+            }
+        return report
+
+    def print_report(self, report):
+        latency = report['latency']
+        self.stdout.write("target:      {}".format(report['config']['target']))
+        self.stdout.write("requests:    {} in {:.2f}s ({:.1f} req/s, {:.1f} successful) at concurrency {}".format(
+            latency['count'] + report['failed'], report['elapsed_s'], report['throughput_rps'],
+            report['successful_rps'], report['config']['concurrency']))
+        self.stdout.write("latency:     {}  max {} (successful requests only)".format(
+            percentiles(latency), milliseconds(latency['max_ms'])))
+        self.stdout.write("status:      {}".format(', '.join(
+            '{}: {}'.format(status, count) for status, count in sorted(report['status'].items()))))
+        for name, endpoint in sorted(report['endpoints'].items()):
+            self.stdout.write("  {:<11} {:>6} ok {:>6} failed  {}".format(
+                name, endpoint['count'], endpoint['failed'], percentiles(endpoint)))
+        if report['database']:
+            self.stdout.write("database:    {:.3f}s in queries, {:.3f}s in writes, {} locked errors".format(
+                report['database']['query_time_s'], report['database']['write_time_s'],
+                report['database']['locked_errors']))
+        if report.get('coalescing'):
+            self.stdout.write("coalescing:  {} calculations, {} requests coalesced, {} rate changes".format(
+                report['coalescing']['calls'], report['coalescing']['coalesced'],
+                report['coalescing']['rate_changes']))
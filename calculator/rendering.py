@@ -0,0 +1,110 @@
+from json.encoder import encode_basestring_ascii
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Responses are byte for byte what JsonResponse(response_data) produced.
+# The fixed part of the envelope is encoded once per operation, and only the
+# request parameters and the result are encoded per request.
+#
+# Setting CALCULATOR_FAST_JSON = True encodes with orjson instead, when it is
+# installed. The output is the same data, but compact (and NaN becomes null),
+# so it is not byte compatible.
+
+CONTENT_TYPE = 'application/json'
+INFINITY = float('inf')
+
+_envelopes = {}
+_templates = {}
+_fallback = DjangoJSONEncoder()
+
+
+def _envelope(operation):
+    # Return:
+    #   (success prefix, error prefix) for an operation
+    envelope = _envelopes.get(operation)
+    if envelope is None:
+        request = encode_basestring_ascii(operation)
+        envelope = (
+            '{{"result": "success", "request": {}, "request_params": '.format(request).encode('ascii'),
+            '{{"result": "error", "request": {}, "request_params": '.format(request).encode('ascii'),
+        )
+        _envelopes[operation] = envelope
+    return envelope
+
+
+def _object_template(keys):
+    # '{"a": %s, "b": %s}' for a given sequence of keys, so each key is only encoded once
+    template = _templates.get(keys)
+    if template is None:
+        template = '{' + ', '.join(
+            encode_basestring_ascii(key).replace('%', '%%') + ': %s' for key in keys) + '}'
+        _templates[keys] = template
+    return template
+
+
+def _float(value):
+    # same spelling as the json module, including its non-standard constants
+    if value != value:
+        return 'NaN'
+    if value == INFINITY:
+        return 'Infinity'
+    if value == -INFINITY:
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+def encode(value):
+    # Return:
+    #   value as a JSON str, in the json module's default style
+    kind = type(value)
+    if kind is float:
+        return _float(value)
+    if kind is str:
+        return encode_basestring_ascii(value)
+    if kind is dict and all(type(key) is str for key in value):
+        return _object_template(tuple(value)) % tuple([encode(item) for item in value.values()])
+    if kind is list:
+        return '[' + ', '.join([encode(item) for item in value]) + ']'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if kind is int:
+        return int.__repr__(value)
+    # anything else (Decimal, numpy scalars, ...) goes through the generic encoder
+    return _fallback.encode(value)
+
+
+def _fast(data):
+    # orjson handles float and int subclasses itself; Decimal and the like go to DjangoJSONEncoder
+    return orjson.dumps(data, default=_fallback.default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def use_fast_encoder():
+    return orjson is not None and getattr(settings, 'CALCULATOR_FAST_JSON', False)
+
+
+def render_success(operation, params, response):
+    if use_fast_encoder():
+        content = _fast({'result': 'success', 'request': operation, 'request_params': params, 'response': response})
+    else:
+        success, error = _envelope(operation)
+        content = success + (encode(params) + ', "response": ' + encode(response) + '}').encode('ascii')
+    return HttpResponse(content, content_type=CONTENT_TYPE)
+
+
+def render_error(operation, params, errors):
+    if use_fast_encoder():
+        content = _fast({'result': 'error', 'request': operation, 'request_params': params, 'errors': errors})
+    else:
+        success, error = _envelope(operation)
+        content = error + (encode(params) + ', "errors": ' + encode(errors) + '}').encode('ascii')
+    return HttpResponse(content, content_type=CONTENT_TYPE, status=400)  # Bad Request
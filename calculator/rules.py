@@ -0,0 +1,99 @@
+import functools
+import json
+import os
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Insurance tiers and minimum down payment rules are read from versioned JSON
+# tables, <CALCULATOR_RULES_DIR>/<CALCULATOR_RULES_VERSION>.json, so a
+# regulatory change is a new table rather than a code change.
+# Each version is loaded and compiled once, into sorted breakpoint arrays
+# that look up a whole batch of scenarios with searchsorted.
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rule_tables')
+DEFAULT_RULES_VERSION = '2017-12'
+
+
+class Rules:
+    def __init__(self, table):
+        try:
+            self.version = table['version']
+            insurance = table['insurance']
+            self.insurance_breakpoints = np.array(insurance['down_percent'], dtype=float)
+            self.insurance_rates = np.array(insurance['rates'], dtype=float)
+            self.max_insured = float(insurance['max_insured'])
+
+            minimum_down = table['minimum_down']
+            self.down_rate = float(minimum_down['rate'])
+            self.down_breakpoints = np.array(minimum_down['above'], dtype=float)
+            self.down_extra_rates = np.array(minimum_down['extra_rates'], dtype=float)
+        except (KeyError, TypeError, ValueError) as error:
+            raise ImproperlyConfigured("malformed rules table: {!r}".format(error))
+
+        if not np.isfinite(self.max_insured) or not np.isfinite(self.down_rate):
+            raise ImproperlyConfigured("max_insured and minimum_down rate must be finite numbers")
+        for name, breakpoints, rates, extra in (
+                ('insurance', self.insurance_breakpoints, self.insurance_rates, 1),
+                ('minimum_down', self.down_breakpoints, self.down_extra_rates, 0)):
+            if breakpoints.ndim != 1 or rates.ndim != 1:
+                raise ImproperlyConfigured("{} breakpoints and rates must be lists of numbers".format(name))
+            if not np.all(np.isfinite(breakpoints)) or not np.all(np.isfinite(rates)):
+                raise ImproperlyConfigured("{} breakpoints and rates must be finite numbers".format(name))
+            if np.any(np.diff(breakpoints) <= 0):
+                raise ImproperlyConfigured("{} breakpoints must be strictly increasing".format(name))
+            if len(rates) != len(breakpoints) + extra:
+                raise ImproperlyConfigured("{} needs {} rates for {} breakpoints".format(
+                    name, len(breakpoints) + extra, len(breakpoints)))
+
+    def insurance_rate(self, downpayment, askingprice):
+        # Mortgage insurance, as a fraction of the mortgage principal.
+        # Rate i applies from breakpoint i - 1 (inclusive) up to breakpoint i.
+        downpayment = np.asarray(downpayment, dtype=float)
+        askingprice = np.asarray(askingprice, dtype=float)
+        if np.any(askingprice == 0):
+            raise ZeroDivisionError("askingprice is zero")
+        tier = np.searchsorted(self.insurance_breakpoints, downpayment / askingprice, side='right')
+        rate = self.insurance_rates[tier]
+        # no insurance for mortgages over the cap
+        rate = np.where((askingprice - downpayment) > self.max_insured, 0.0, rate)
+        return _scalar(rate)
+
+    def minimum_down_payment(self, askingprice):
+        # The base rate of the asking price, plus each extra rate of the amount above its breakpoint
+        askingprice = np.asarray(askingprice, dtype=float)
+        tiers = np.searchsorted(self.down_breakpoints, askingprice, side='left')
+        min_down = askingprice * self.down_rate
+        # add tiers in order, so each scenario sums exactly like the single scenario rule
+        for i, (breakpoint, rate) in enumerate(zip(self.down_breakpoints, self.down_extra_rates)):
+            min_down = np.where(tiers > i, min_down + (askingprice - breakpoint) * rate, min_down)
+        return _scalar(min_down)
+
+
+def _scalar(values):
+    # plain floats for single scenarios, arrays for batches
+    if values.ndim == 0:
+        return float(values)
+    return values
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(directory, version):
+    path = os.path.join(directory, '{}.json'.format(version))
+    try:
+        with open(path) as table_file:
+            table = json.load(table_file)
+    except (OSError, ValueError) as error:
+        raise ImproperlyConfigured("can't load rules version {!r} from {}: {}".format(version, path, error))
+    rules = Rules(table)
+    if rules.version != version:
+        raise ImproperlyConfigured("{} holds rules version {!r}, not {!r}".format(path, rules.version, version))
+    return rules
+
+
+def get_rules(version=None):
+    # Return:
+    #   compiled rules for a version, by default the configured one
+    directory = getattr(settings, 'CALCULATOR_RULES_DIR', DEFAULT_RULES_DIR)
+    if version is None:
+        version = getattr(settings, 'CALCULATOR_RULES_VERSION', DEFAULT_RULES_VERSION)
+    return load_rules(directory, version)
@@ -0,0 +1,113 @@
+import numpy as np
+
+# Newton iterations allowed per row before giving up
+MAX_ITERATIONS = 50
+
+
+def newton(function, derivative, lower, upper, guess, tolerance, max_iterations=MAX_ITERATIONS, step_tolerance=1e-12):
+    # Safeguarded Newton's method, solving function(x) = 0 for every row of an array at once.
+    #
+    # Each row keeps a bracket [lower, upper] with a sign change of function, which
+    # shrinks every iteration. A Newton step that leaves the bracket is replaced by
+    # bisection, so every row converges even from a poor guess.
+    # Rows stop once |function(x)| <= tolerance or the step is negligible; the rest
+    # carry on until max_iterations.
+    #
+    # Return:
+    #   (x, iterations, residual, converged) arrays, with x NaN for rows that had
+    #   no sign change in [lower, upper]
+    lower, upper, guess = np.broadcast_arrays(
+        np.asarray(lower, dtype=float), np.asarray(upper, dtype=float), np.asarray(guess, dtype=float))
+    lower = lower.copy()
+    upper = upper.copy()
+    lower_sign = np.sign(function(lower))
+    bracketed = lower_sign != np.sign(function(upper))
+
+    x = np.clip(guess, lower, upper)
+    iterations = np.zeros(x.shape, dtype=int)
+    converged = ~bracketed
+
+    for iteration in range(max_iterations):
+        value = function(x)
+        converged = converged | (np.abs(value) <= tolerance)
+        active = ~converged
+        if not active.any():
+            break
+
+        # the root stays on the side of x where the sign changes
+        same_as_lower = np.sign(value) == lower_sign
+        lower = np.where(active & same_as_lower, x, lower)
+        upper = np.where(active & ~same_as_lower, x, upper)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = x - value / derivative(x)
+        inside = np.isfinite(step) & (step > lower) & (step < upper)
+        step = np.where(inside, step, (lower + upper) / 2)
+
+        small_step = np.abs(step - x) <= step_tolerance * np.maximum(1, np.abs(x))
+        x = np.where(active, step, x)
+        iterations += active
+        converged = converged | (active & small_step)
+
+    x = np.where(bracketed, x, np.nan)
+    residual = np.where(bracketed, function(x), np.nan)
+    return x, iterations, residual, converged & bracketed
+
+
+def solve_periods(principal, rate_per_period, payment, max_periods, max_iterations=MAX_ITERATIONS):
+    # Number of payments (fractional) that pays off the principal, for every row.
+    # f(n) = Lc / (1 - (1 + c)^-n) - P is decreasing in n.
+    # The search starts at one payment. Rows whose first payment already clears
+    # the principal and its interest come back as exactly 1, and rows whose
+    # payment can't repay the principal within max_periods come back as NaN.
+    L, c, P, max_periods = np.broadcast_arrays(
+        np.asarray(principal, dtype=float), np.asarray(rate_per_period, dtype=float),
+        np.asarray(payment, dtype=float), np.asarray(max_periods, dtype=float))
+    log_growth = np.log1p(c)
+    zero_rate = c == 0
+
+    def function(n):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            owed = L * c / -np.expm1(-n * log_growth)
+        return np.where(zero_rate, L / n, owed) - P
+
+    def derivative(n):
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            discount = np.exp(-n * log_growth)
+            slope = -L * c * discount * log_growth / np.expm1(-n * log_growth) ** 2
+        return np.where(zero_rate, -L / n ** 2, slope)
+
+    # with no interest it would take L / P payments, so that is a lower bound
+    guess = L / P
+    periods, iterations, residual, converged = newton(
+        function, derivative, 1, max_periods, guess, 1e-9 * P, max_iterations)
+
+    # the final payment only covers what is left, so one payment is an exact payoff
+    one_payment = function(np.ones_like(L)) <= 0
+    periods = np.where(one_payment, 1.0, periods)
+    iterations = np.where(one_payment, 0, iterations)
+    residual = np.where(one_payment, 0.0, residual)
+    return periods, iterations, residual, converged | one_payment
+
+
+def solve_rate(principal, payment, payments, max_iterations=MAX_ITERATIONS):
+    # Interest rate per period at which `payments` payments of P pay off the principal, for every row.
+    # f(c) = Lc / (1 - (1 + c)^-n) - P is increasing in c. Since P > Lc, the rate is below P / L.
+    # Rows where P * n doesn't cover the principal (no positive rate) come back as NaN.
+    L, P, n = np.broadcast_arrays(
+        np.asarray(principal, dtype=float), np.asarray(payment, dtype=float), np.asarray(payments, dtype=float))
+
+    def function(c):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            owed = L * c / -np.expm1(-n * np.log1p(c))
+        return np.where(c == 0, L / n, owed) - P
+
+    def derivative(c):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discount = np.exp(-n * np.log1p(c))
+            slope = L * ((1 - discount) - c * n * discount / (1 + c)) / (1 - discount) ** 2
+        return np.where(c == 0, L * (n + 1) / (2 * n), slope)
+
+    # first order expansion around c = 0: P ~ L/n (1 + c(n + 1)/2)
+    guess = 2 * (P * n / L - 1) / (n + 1)
+    return newton(function, derivative, 0, P / L, guess, 1e-9 * P, max_iterations)
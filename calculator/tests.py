@@ -1,11 +1,13 @@
 from decimal import Decimal
 from datetime import timedelta
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.utils import timezone
 from django.urls import reverse
 from django.http import JsonResponse
 from .models import InterestRate
 import json
+import math
+import time
 
 
 class InterestRateModelTests(TestCase):
@@ -129,3 +131,598 @@ class InterestRateModelTests(TestCase):
 
         now = timezone.now()
         self.assertEqual(InterestRate.get_rate_at_time(now), Decimal("0.05"))
+
+    def test_schedule_comparison(self):
+        querystring = '?askingprice=500000&downpayment=80000&amortizationperiod=15'
+        response = self.client.get(reverse('calculator:schedule comparison') + querystring)
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data.get('result'), 'success')
+        comparison = data.get('response')
+
+        # regular schedules match the payment amount endpoint
+        for schedule in ('weekly', 'monthly'):
+            response = self.client.get(reverse('calculator:payment amount') + querystring + '&paymentschedule=' + schedule)
+            payment = json.loads(response.content.decode('utf-8')).get('response')
+            self.assertAlmostEqual(comparison[schedule]['payment'], payment, places=6)
+            self.assertAlmostEqual(comparison[schedule]['payoff_years'], 15, places=1)
+        # biweekly charges rate / 26.09 per payment here, while /payment-amount
+        # divides by 52.177457 * 2, so the comparison's payment is higher
+        response = self.client.get(reverse('calculator:payment amount') + querystring + '&paymentschedule=biweekly')
+        payment = json.loads(response.content.decode('utf-8')).get('response')
+        self.assertGreater(comparison['biweekly']['payment'], payment)
+        self.assertAlmostEqual(comparison['biweekly']['payoff_years'], 15, places=1)
+        self.assertEqual(comparison['monthly']['payments'], 180)
+        self.assertAlmostEqual(comparison['monthly']['total_interest'],
+                               comparison['monthly']['payment'] * 180 - 420000 * 1.018, places=4)
+
+        # accelerated schedules pay off early, with less interest
+        monthly = comparison['monthly']
+        for schedule in ('accelerated_weekly', 'accelerated_biweekly'):
+            self.assertLess(comparison[schedule]['payoff_years'], monthly['payoff_years'])
+            self.assertLess(comparison[schedule]['total_interest'], monthly['total_interest'])
+        self.assertAlmostEqual(comparison['accelerated_weekly']['payment'], monthly['payment'] / 4, places=6)
+        self.assertAlmostEqual(comparison['accelerated_biweekly']['payment'], monthly['payment'] / 2, places=6)
+
+        # downpayment too small
+        querystring = '?askingprice=500000&downpayment=10000&amortizationperiod=15'
+        response = self.client.get(reverse('calculator:schedule comparison') + querystring)
+        self.assertEqual(response.status_code, 400)
+
+    def test_payment_amount_summary(self):
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&amortizationperiod=15&summary=true'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data.get('result'), 'success')
+        self.assertAlmostEqual(data.get('response', {}).get('payment'), 655.00, places=2)
+        self.assertAlmostEqual(data.get('response', {}).get('total_insurance'), 420000 * 0.018, places=2)
+
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&amortizationperiod=15&summary=maybe'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 400)
+
+    def test_payment_amount_summary_matches_schedule(self):
+        from calculator.amortization import PAYMENTS_PER_YEAR
+        from calculator.views.payment_amount import PaymentAmountView
+
+        for schedule, period, downpayment in (('weekly', 15, 80000), ('biweekly', 25, 25000),
+                                              ('monthly', 7.5, 100000), ('monthly', 5, 40000)):
+            view = PaymentAmountView(0.025)
+            totals = view.calculate(downpayment, 500000, schedule, period, summary=True)
+            payments_per_year = PAYMENTS_PER_YEAR[schedule]
+            periods = int(round(period * payments_per_year))
+            c = {'weekly': 0.025 / 52.177457, 'biweekly': 0.025 / 52.177457 / 2, 'monthly': 0.025 / 12}[schedule]
+
+            # reference: walk the schedule one payment at a time
+            balance = (500000 - downpayment) * (1 + {80000: 0.018, 25000: 0.0315, 100000: 0, 40000: 0.0315}[downpayment])
+            by_year = {}
+            renewal_balance = None
+            for k in range(1, periods + 1):
+                interest = balance * c
+                balance += interest - totals['payment']
+                year = int(math.ceil(k / payments_per_year - 1e-12))
+                by_year[year] = by_year.get(year, 0) + interest
+                if k == round(5 * payments_per_year):
+                    renewal_balance = max(balance, 0)
+
+            self.assertEqual(len(totals['interest_by_year']), len(by_year))
+            for expected, actual in zip([by_year[y] for y in sorted(by_year)], totals['interest_by_year']):
+                self.assertEqual(round(actual, 2), round(expected, 2))
+            self.assertEqual(round(totals['total_interest'], 2), round(sum(by_year.values()), 2))
+            self.assertEqual(round(totals['renewal_balance'], 2), round(renewal_balance, 2))
+
+    def test_payment_amount_fixed(self):
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&amortizationperiod=15&mode=fixed'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data.get('result'), 'success')
+        self.assertEqual(data.get('response'), '655.00')
+
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&amortizationperiod=15&mode=double'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 400)
+
+    def test_payment_amount_fixed_matches_decimal_schedule(self):
+        from decimal import ROUND_HALF_EVEN
+        from calculator.views.payment_amount import PaymentAmountView
+
+        view = PaymentAmountView(0.025)
+        totals = view.calculate(40000, 350000, 'monthly', 10, summary=True, mode='fixed')
+        payment = Decimal(totals['payment'])
+
+        # reference: Decimal schedule, interest rounded to the cent every period
+        balance = Decimal('310000') * Decimal('1.024')
+        total_interest = Decimal(0)
+        by_year = [Decimal(0)] * 10
+        for k in range(1, 121):
+            interest = (balance * Decimal('0.025') / 12).quantize(Decimal('0.01'), rounding=ROUND_HALF_EVEN)
+            total_interest += interest
+            by_year[(k - 1) // 12] += interest
+            balance += interest
+            if k == 60:
+                renewal_balance = balance - payment
+            balance -= payment if k < 120 else balance
+
+        self.assertEqual(Decimal(totals['total_insurance']), Decimal('7440.00'))
+        self.assertEqual(Decimal(totals['total_interest']), total_interest)
+        self.assertEqual([Decimal(interest) for interest in totals['interest_by_year']], by_year)
+        # the same fields as the float summary, plus the final payment
+        self.assertEqual(set(totals) - set(view.calculate(40000, 350000, 'monthly', 10, summary=True)), {'final_payment'})
+        self.assertEqual(Decimal(totals['renewal_balance']), renewal_balance)
+        self.assertEqual(payment * 119 + Decimal(totals['final_payment']),
+                         Decimal('317440.00') + total_interest)
+
+    def test_payment_amount_fixed_overflow(self):
+        import numpy as np
+        from calculator.fixed_point import amortize, fits_int64
+        from calculator.views.payment_amount import PaymentAmountView
+
+        # balance * rate numerator would overflow an int64, so fixed mode refuses
+        view = PaymentAmountView(0.025)
+        with self.assertRaises(ValueError):
+            view.calculate(1.5e13, 5e13, 'weekly', 25, summary=True, mode='fixed')
+        self.assertEqual(view.errors, ["mortgage too large for mode 'fixed'"])
+
+        querystring = '?askingprice=50000000000000&downpayment=15000000000000&paymentschedule=weekly&amortizationperiod=25&mode=fixed'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 400)
+
+        self.assertTrue(fits_int64(np.array([2 ** 31, 5]), 2 ** 31))
+        self.assertFalse(fits_int64(np.array([2 ** 32, 5]), 2 ** 31))
+        with self.assertRaises(OverflowError):
+            amortize(np.array([100, 2 ** 32]), 2 ** 31, 10 ** 9, 1, 10)
+
+    def test_fixed_point_batch(self):
+        import numpy as np
+        from calculator.fixed_point import amortize, amortize_loan, divide_half_even
+
+        self.assertEqual(list(divide_half_even(np.array([5, 15, 25, 26, -5]), 10)), [0, 2, 2, 3, 0])
+
+        # a batch gives the same result as each loan on its own
+        principal = np.array([31976500, 42756000, 10000000])
+        numerator = np.array([1, 1, 1])
+        denominator = np.array([480, 4173, 1200])
+        payment = np.array([281000, 32750, 100000])
+        payments = np.array([120, 783, 110])
+        batch = amortize(principal, numerator, denominator, payment, payments)
+        for i in range(3):
+            single = amortize(principal[i], numerator[i], denominator[i], payment[i], payments[i])
+            self.assertEqual(batch['final_payment'][i], single['final_payment'])
+            self.assertEqual(batch['total_interest'][i], single['total_interest'])
+
+        # the single loan walk in Python ints agrees with the batch
+        batch = amortize(principal, numerator, denominator, payment, payments, renewal_period=60)
+        for i, payments_per_year in enumerate((12, 52.177457, 12)):
+            loan = amortize_loan(int(principal[i]), int(numerator[i]), int(denominator[i]), int(payment[i]),
+                                 int(payments[i]), payments_per_year, renewal_period=60)
+            self.assertEqual(loan['final_payment'], batch['final_payment'][i])
+            self.assertEqual(loan['total_interest'], batch['total_interest'][i])
+            self.assertEqual(loan['renewal_balance'], batch['renewal_balance'][i])
+            self.assertEqual(sum(loan['interest_by_year']), loan['total_interest'])
+
+
+class CoalescingTests(TestCase):
+
+    def test_single_flight(self):
+        import threading
+        from calculator.coalescing import SingleFlight
+
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return object()
+
+        def call():
+            results.append(flight.do('key', slow))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call) for i in range(4)]
+        for follower in followers:
+            follower.start()
+        # wait until every follower has joined the in-flight call
+        deadline = time.time() + 5
+        while flight.stats()['coalesced'] < 4 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(flight.stats(), {'calls': 1, 'coalesced': 4})
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # once finished, the next call runs again
+        flight.do('key', lambda: None)
+        self.assertEqual(flight.stats(), {'calls': 2, 'coalesced': 4})
+
+    def test_rate_change_bumps_version(self):
+        from calculator import coalescing
+
+        version = coalescing.rate_version
+        InterestRate(rate=Decimal("0.03")).save()
+        self.assertEqual(coalescing.rate_version, version + 1)
+
+    def test_concurrent_view_requests(self):
+        import threading
+        from unittest import mock
+        from django.test import RequestFactory
+        from calculator import coalescing
+        from calculator.views import payment_amount
+
+        entered = threading.Event()
+        release = threading.Event()
+        lookups = []
+
+        def get_rate_at_time(time):
+            # the first lookup (the leader's) blocks until released
+            lookups.append(time)
+            if len(lookups) == 1:
+                entered.set()
+                release.wait(5)
+            return Decimal("0.025")
+
+        factory = RequestFactory()
+        paths = [
+            '/payment-amount?askingprice=500000&downpayment=80000&paymentschedule=weekly&amortizationperiod=15',
+            '/payment-amount?amortizationperiod=15&paymentschedule=weekly&downpayment=80000&askingprice=500000',
+            '/payment-amount?askingprice=500000&downpayment=80000&paymentschedule=WEEKLY&amortizationperiod=15',
+        ]
+        responses = {}
+
+        def call(name, path):
+            responses[name] = payment_amount.request(factory.get(path))
+
+        def wait_for(condition):
+            deadline = time.time() + 5
+            while not condition() and time.time() < deadline:
+                time.sleep(0.001)
+
+        before = coalescing.flights.stats()
+        with mock.patch.object(payment_amount.InterestRate, 'get_rate_at_time', side_effect=get_rate_at_time):
+            leader = threading.Thread(target=call, args=('leader', paths[0]))
+            leader.start()
+            entered.wait(5)
+
+            # same parameters in another order and case join the leader's calculation
+            followers = [threading.Thread(target=call, args=(i, path)) for i, path in enumerate(paths)]
+            for follower in followers:
+                follower.start()
+            wait_for(lambda: coalescing.flights.stats()['coalesced'] - before['coalesced'] >= 3)
+
+            # after a rate change, the same request no longer shares the in-flight one
+            coalescing.rate_changed()
+            call('after rate change', paths[0])
+            self.assertEqual(len(lookups), 2)
+
+            release.set()
+            for thread in [leader] + followers:
+                thread.join(5)
+
+        after = coalescing.flights.stats()
+        self.assertEqual(after['calls'] - before['calls'], 2)
+        self.assertEqual(after['coalesced'] - before['coalesced'], 3)
+        self.assertEqual(len(responses), 5)
+        for response in responses.values():
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, responses['leader'].content)
+
+    def test_coalesced_view_response(self):
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=WEEKLY&amortizationperiod=15'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertAlmostEqual(data.get('response'), 655.00, places=2)
+
+
+class RenderingTests(TestCase):
+
+    def test_byte_compatible_with_json_response(self):
+        from calculator.rendering import render_success, render_error
+
+        params = {'askingprice': 500000.0, 'downpayment': 80000.0, 'paymentschedule': 'weekly', 'amortizationperiod': 15.0}
+        for result in (655.0018382403105, '655.00', {'old_rate': '0.025', 'new_rate': '0.05'},
+                       {'weekly': {'payment': float('nan'), 'payments': 783, 'rate': Decimal('0.025')}}):
+            expected = JsonResponse({'result': 'success', 'request': 'Payment Amount',
+                                     'request_params': params, 'response': result})
+            self.assertEqual(render_success('Payment Amount', params, result).content, expected.content)
+
+        errors = ["missing parameter 'askingprice'", 'caf\xe9 100%']
+        expected = JsonResponse({'result': 'error', 'request': 'Payment Amount', 'request_params': {}, 'errors': errors})
+        response = render_error('Payment Amount', {}, errors)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+
+    def test_fast_encoder(self):
+        import numpy as np
+        from django.test import override_settings
+        from calculator import rendering
+
+        if rendering.orjson is None:
+            self.skipTest("orjson is not installed")
+
+        params = {'askingprice': 500000.0, 'downpayment': 80000.0, 'paymentschedule': 'weekly', 'summary': True}
+        result = {'payment': np.float64(655.0018382403105), 'payments': 783, 'rate': Decimal('0.025'),
+                  'interest_by_year': [10336.39, 10051.1], 'final_payment': '655.00', 'renewal_balance': None}
+        errors = ["missing parameter 'askingprice'", 'caf\xe9 100%']
+        default_success = rendering.render_success('Payment Amount', params, result)
+        default_error = rendering.render_error('Payment Amount', params, errors)
+        with override_settings(CALCULATOR_FAST_JSON=True):
+            self.assertTrue(rendering.use_fast_encoder())
+            fast_success = rendering.render_success('Payment Amount', params, result)
+            fast_error = rendering.render_error('Payment Amount', params, errors)
+
+        # compact, so not the same bytes, but the same data
+        self.assertNotEqual(fast_success.content, default_success.content)
+        self.assertEqual(json.loads(fast_success.content.decode('utf-8')), json.loads(default_success.content.decode('utf-8')))
+        self.assertEqual(json.loads(fast_error.content.decode('utf-8')), json.loads(default_error.content.decode('utf-8')))
+        self.assertEqual(fast_error.status_code, 400)
+        self.assertEqual(fast_success['Content-Type'], default_success['Content-Type'])
+
+
+class SolverTests(TestCase):
+
+    def test_amortization_period(self):
+        # 655.0018 weekly is the payment amount for 15 years
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&paymentamount=655.0018382403105'
+        response = self.client.get(reverse('calculator:amortization period') + querystring)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data.get('result'), 'success')
+        self.assertAlmostEqual(data['response']['amortizationperiod'], 783 / 52.177457, places=6)
+        self.assertEqual(data['response']['payments'], 783)
+        self.assertGreater(data['response']['iterations'], 0)
+
+        # never pays off the interest
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&paymentamount=100'
+        response = self.client.get(reverse('calculator:amortization period') + querystring)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content.decode('utf-8'))['errors'],
+                         ["paymentamount too low to pay off the mortgage within 100 years"])
+
+        # the first payment clears the whole mortgage
+        for payment in ('1000000000000000', '427764.86'):
+            querystring = '?askingprice=500000&downpayment=80000&paymentschedule=weekly&paymentamount=' + payment
+            response = self.client.get(reverse('calculator:amortization period') + querystring)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content.decode('utf-8'))
+            self.assertEqual(data['response']['payments'], 1)
+            self.assertAlmostEqual(data['response']['amortizationperiod'], 1 / 52.177457, places=9)
+
+    def test_implied_rate(self):
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=monthly&amortizationperiod=15'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        payment = json.loads(response.content.decode('utf-8')).get('response')
+
+        response = self.client.get(reverse('calculator:implied rate') + querystring + '&paymentamount={!r}'.format(payment))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertAlmostEqual(data['response']['nominal_rate'], 0.025, places=9)
+        self.assertAlmostEqual(data['response']['effective_rate'], (1 + 0.025 / 12) ** 12 - 1, places=9)
+
+        # payments don't even cover the principal
+        response = self.client.get(reverse('calculator:implied rate') + querystring + '&paymentamount=2000')
+        self.assertEqual(response.status_code, 400)
+
+    def test_biweekly_round_trip(self):
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=biweekly&amortizationperiod=15'
+        response = self.client.get(reverse('calculator:payment amount') + querystring)
+        payment = json.loads(response.content.decode('utf-8')).get('response')
+
+        response = self.client.get(reverse('calculator:implied rate') + querystring + '&paymentamount={!r}'.format(payment))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertAlmostEqual(data['response']['nominal_rate'], 0.025, places=9)
+
+        querystring = '?askingprice=500000&downpayment=80000&paymentschedule=biweekly&paymentamount={!r}'.format(payment)
+        response = self.client.get(reverse('calculator:amortization period') + querystring)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertAlmostEqual(data['response']['amortizationperiod'], round(15 * 52.177457 / 2) / (52.177457 / 2), places=6)
+        self.assertEqual(data['response']['payments'], 391)
+
+    def test_iteration_cap(self):
+        from unittest import mock
+        from calculator.views.amortization_period import AmortizationPeriodView
+        from calculator.views.implied_rate import ImpliedRateView
+
+        # a solvable row that runs out of iterations isn't reported as having no solution
+        with mock.patch('calculator.views.amortization_period.MAX_ITERATIONS', 1):
+            view = AmortizationPeriodView(0.025)
+            with self.assertRaises(ValueError):
+                view.calculate(80000, 500000, 655.0018382403105, 'weekly')
+            self.assertEqual(view.errors, ["amortizationperiod did not converge within 1 iterations"])
+
+        with mock.patch('calculator.views.implied_rate.MAX_ITERATIONS', 1):
+            view = ImpliedRateView()
+            with self.assertRaises(ValueError):
+                view.calculate(80000, 500000, 3000, 'monthly', 15)
+            self.assertEqual(view.errors, ["interest rate did not converge within 1 iterations"])
+
+    def test_batch(self):
+        import numpy as np
+        from calculator.amortization import level_payment
+        from calculator.solver import solve_periods, solve_rate
+
+        principal = np.array([427560, 300000, 100000, 100000, 100000])
+        rate_per_period = np.array([0.025 / 52.177457, 0.05 / 12, 0, 0.03 / 26.0887285, 0.01])
+        payments = np.array([783, 300, 120, 652, 60])
+        payment = level_payment(principal, rate_per_period, payments)
+        payment[-1] = 900  # doesn't cover the interest
+
+        periods, iterations, residual, converged = solve_periods(principal, rate_per_period, payment, 5000)
+        self.assertEqual(list(converged), [True, True, True, True, False])
+        np.testing.assert_allclose(periods[:4], payments[:4], rtol=1e-8)
+        self.assertTrue(np.isnan(periods[4]))
+        self.assertTrue(np.all(iterations <= 50))
+        self.assertTrue(np.all(np.abs(residual[:4]) <= 1e-9 * payment[:4]))
+
+        # a payment that clears the loan at once is one payment, not unsolvable
+        periods, iterations, residual, converged = solve_periods([100000, 100000], [0.01, 0], [1e15, 100000], 5000)
+        self.assertEqual(list(periods), [1, 1])
+        self.assertEqual(list(converged), [True, True])
+
+        rate, iterations, residual, converged = solve_rate(principal, payment, payments)
+        self.assertEqual(list(converged), [True, True, True, True, False])
+        np.testing.assert_allclose(rate[:4], rate_per_period[:4], atol=1e-12)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+
+    def test_percentile(self):
+        from calculator.management.commands.loadtest import percentile
+
+        ordered = list(range(1, 101))
+        self.assertEqual(percentile(ordered, 0.50), 50)
+        self.assertEqual(percentile(ordered, 0.95), 95)
+        self.assertEqual(percentile(ordered, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_in_process(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('loadtest', requests=40, concurrency=4, mix='payment=3,mortgage=1',
+                         output=output, stdout=StringIO())
+            with open(output) as results:
+                report = json.load(results)
+
+            # the shared in-memory test database locks whole tables, so writes run one at a time
+            call_command('loadtest', requests=20, concurrency=1, mix='payment=1,rate=1',
+                         output=output, stdout=StringIO())
+            with open(output) as results:
+                rate_report = json.load(results)
+
+        self.assertEqual(report['latency']['count'], 40)
+        self.assertEqual(report['status'], {'200': 40})
+        self.assertEqual(set(report['endpoints']), {'payment', 'mortgage'})
+        self.assertEqual(report['coalescing']['rate_changes'], 0)
+        self.assertEqual(rate_report['status'], {'200': 20})
+        self.assertEqual(rate_report['coalescing']['rate_changes'], rate_report['endpoints']['rate']['count'])
+        self.assertGreater(report['throughput_rps'], 0)
+        self.assertIsNotNone(report['database'])
+        self.assertIn('write_time_s', report['database'])
+
+    def test_latency_only_counts_successes(self):
+        from calculator.management.commands.loadtest import Command
+
+        command = Command()
+        command.timer = None
+        results = [('payment', 200, 0.010), ('payment', 200, 0.020), ('rate', 403, 0.001), ('payment', 0, 30.0)]
+        options = {'url': 'http://127.0.0.1:8000', 'concurrency': 1, 'requests': 4, 'hot_fraction': 0, 'seed': 0}
+        report = command.report(results, 1.0, options, {'payment': 1, 'rate': 1})
+
+        self.assertEqual(report['latency']['count'], 2)
+        self.assertAlmostEqual(report['latency']['max_ms'], 20)
+        self.assertEqual(report['failed'], 2)
+        self.assertEqual(report['endpoints']['payment']['failed'], 1)
+        self.assertEqual(report['endpoints']['rate']['count'], 0)
+        self.assertIsNone(report['endpoints']['rate']['p50_ms'])
+        self.assertEqual(report['status'], {'200': 2, '403': 1, '0': 1})
+
+
+class RulesTests(TestCase):
+
+    @staticmethod
+    def reference_insurance_rate(downpayment, askingprice):
+        down_percent = downpayment / askingprice
+        if down_percent < 0.1:
+            insurance_rate = 0.0315
+        elif down_percent < 0.15:
+            insurance_rate = 0.024
+        elif down_percent < 0.2:
+            insurance_rate = 0.018
+        else:
+            insurance_rate = 0
+        if (askingprice - downpayment) > 1e6:
+            insurance_rate = 0
+        return insurance_rate
+
+    @staticmethod
+    def reference_minimum_down_payment(askingprice):
+        min_down = askingprice * 0.05
+        if askingprice > 500000:
+            min_down += (askingprice - 500000) * 0.1
+        return min_down
+
+    def test_matches_hard_coded_rules(self):
+        import numpy as np
+        from calculator.rules import get_rules
+
+        rules = get_rules()
+        random = np.random.RandomState(0)
+        askingprice = np.concatenate([random.uniform(1, 3e6, 5000), [500000, 500000.01, 499999.99, 1e6, 1250000, 1]])
+        downpayment = np.concatenate([askingprice[:5000] * random.uniform(0, 0.4, 5000), [50000, 75000, 100000, 0, 250000, 0.2]])
+
+        insurance = rules.insurance_rate(downpayment, askingprice)
+        min_down = rules.minimum_down_payment(askingprice)
+        for i in range(len(askingprice)):
+            a, d = float(askingprice[i]), float(downpayment[i])
+            self.assertEqual(insurance[i], self.reference_insurance_rate(d, a))
+            self.assertEqual(min_down[i], self.reference_minimum_down_payment(a))
+
+        # exactly on the breakpoints, and single scenarios
+        for down_percent in (0.1, 0.15, 0.2):
+            self.assertEqual(rules.insurance_rate(100 * down_percent, 100), self.reference_insurance_rate(100 * down_percent, 100))
+        self.assertEqual(rules.insurance_rate(0, 1e6 + 1), 0)
+        self.assertEqual(rules.minimum_down_payment(750000), 62500.0)
+        self.assertIsInstance(rules.minimum_down_payment(750000), float)
+
+    def test_versioned_tables(self):
+        import os
+        import tempfile
+        from django.core.exceptions import ImproperlyConfigured
+        from django.test import override_settings
+        from calculator.rules import get_rules
+
+        table = {
+            'version': 'test',
+            'insurance': {'down_percent': [0.2], 'rates': [0.04, 0], 'max_insured': 500000},
+            'minimum_down': {'rate': 0.1, 'above': [], 'extra_rates': []},
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'test.json'), 'w') as table_file:
+                json.dump(table, table_file)
+            with open(os.path.join(directory, 'bad.json'), 'w') as table_file:
+                json.dump(dict(table, version='bad', minimum_down={'rate': 0.1, 'above': [2, 1], 'extra_rates': [0, 0]}), table_file)
+            malformed = {
+                'scalar': dict(table, minimum_down={'rate': 0.1, 'above': 500000, 'extra_rates': 0.05}),
+                'nan': dict(table, insurance=dict(table['insurance'], down_percent=[float('nan')])),
+                'nested': dict(table, insurance=dict(table['insurance'], down_percent=[[0.2]], rates=[[0.04, 0]])),
+                'infinite': dict(table, insurance=dict(table['insurance'], max_insured=float('inf'))),
+            }
+            for version, bad_table in malformed.items():
+                with open(os.path.join(directory, version + '.json'), 'w') as table_file:
+                    json.dump(dict(bad_table, version=version), table_file)
+
+            with override_settings(CALCULATOR_RULES_DIR=directory, CALCULATOR_RULES_VERSION='test'):
+                self.assertIs(get_rules(), get_rules())
+                self.assertEqual(get_rules().insurance_rate(10000, 100000), 0.04)
+                self.assertEqual(get_rules().minimum_down_payment(750000), 75000)
+
+                querystring = '?askingprice=750000&downpayment=70000&paymentschedule=weekly&amortizationperiod=15'
+                response = self.client.get(reverse('calculator:payment amount') + querystring)
+                self.assertEqual(response.status_code, 400)
+
+                with self.assertRaises(ImproperlyConfigured):
+                    get_rules('bad')
+                with self.assertRaises(ImproperlyConfigured):
+                    get_rules('missing')
+                for version in malformed:
+                    with self.assertRaises(ImproperlyConfigured, msg=version):
+                        get_rules(version)
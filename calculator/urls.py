@@ -1,6 +1,7 @@
 from django.urls import path
 
-from calculator.views import payment_amount, mortgage_amount, interest_rate
+from calculator.views import (
+    payment_amount, mortgage_amount, interest_rate, schedule_comparison, amortization_period, implied_rate)
 
 app_name = 'calculator'
 
@@ -8,4 +9,7 @@ urlpatterns = [
     path('payment-amount', payment_amount.request, name='payment amount'),
     path('mortgage-amount', mortgage_amount.request, name='mortgage amount'),
     path('interest-rate', interest_rate.request, name='interest rate'),
+    path('schedule-comparison', schedule_comparison.request, name='schedule comparison'),
+    path('amortization-period', amortization_period.request, name='amortization period'),
+    path('implied-rate', implied_rate.request, name='implied rate'),
 ]
\ No newline at end of file
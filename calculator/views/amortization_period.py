@@ -0,0 +1,159 @@
+import numpy as np
+from django.utils import timezone
+from django.http import HttpResponseNotAllowed
+from calculator.models import InterestRate
+from calculator.rendering import render_success, render_error
+from calculator.coalescing import coalesce
+from calculator.amortization import PAYMENTS_PER_YEAR, RATE_PERIODS_PER_YEAR, minimum_down_payment, insurance_rate
+from calculator.solver import MAX_ITERATIONS, solve_periods
+
+# Longest amortization period searched for, in years
+MAX_YEARS = 100
+
+
+@coalesce
+def request(request):
+    # Methods accepted:
+    #   GET
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(permitted_methods=['GET'])
+
+    now = timezone.now()
+    rate_per_year = float(InterestRate.get_rate_at_time(now))
+    amortization_period = AmortizationPeriodView(rate_per_year)
+    return amortization_period.get(request)
+
+
+class AmortizationPeriodView:
+    def __init__(self, interest_rate):
+        self.operation = "Amortization Period"
+        self.params = {}
+        self.rate_per_year = interest_rate
+        self.errors = []
+
+    def error_response(self, errors):
+        return render_error(self.operation, self.params, errors)
+
+    def success_response(self, response):
+        return render_success(self.operation, self.params, response)
+
+    def decode_params(self, request):
+        # Expected parameters:
+        #   askingprice: float
+        #   downpayment: float
+        #   paymentamount: float
+        #   paymentschedule: (weekly | biweekly | monthly)
+
+        # extract variables
+        asking_price = request.GET.get('askingprice', None)
+        down_payment = request.GET.get('downpayment', None)
+        payment_amount = request.GET.get('paymentamount', None)
+        payment_schedule = request.GET.get('paymentschedule', '').lower()
+
+        # required parameters were present
+        if asking_price is None:
+            self.errors.append("missing parameter 'askingprice'")
+        if down_payment is None:
+            self.errors.append("missing parameter 'downpayment'")
+        if payment_amount is None:
+            self.errors.append("missing parameter 'paymentamount'")
+        if not payment_schedule:
+            self.errors.append("missing parameter 'paymentschedule'")
+
+        if self.errors:
+            raise ValueError()
+
+        params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'paymentamount': payment_amount,
+            'paymentschedule': payment_schedule
+        }
+        return params
+
+    def validate(self, params):
+        # Validation:
+        #   downpayment must be at least 5% of the first $500k plus 10% of any amount above $500k (so $50k on a $750k mortgage)
+        #   paymentamount must be positive
+        #   paymentschedule must be 'weekly', 'biweekly', or 'monthly'
+
+        # validate asking price and potentially exit early
+        try:
+            asking_price = float(params['askingprice'])
+        except:
+            self.errors.append("askingprice must be a number")
+            raise ValueError()
+
+        # validate down payment
+        try:
+            down_payment = float(params['downpayment'])
+        except:
+            self.errors.append("downpayment must be a number")
+            down_payment = 0
+        else:
+            min_down = minimum_down_payment(asking_price)
+            if down_payment < min_down:
+                self.errors.append("downpayment too low for askingprice. Must be at least ${}".format(min_down))
+
+        # validate payment amount
+        try:
+            payment_amount = float(params['paymentamount'])
+        except:
+            self.errors.append("paymentamount must be a number")
+            payment_amount = 0
+        else:
+            if not payment_amount > 0:
+                self.errors.append("paymentamount must be positive")
+
+        # validate payment schedule
+        if params['paymentschedule'] not in ('weekly', 'biweekly', 'monthly'):
+            self.errors.append("paymentschedule must be one of 'weekly', 'biweekly', or 'monthly'")
+
+        if self.errors:
+            raise ValueError()
+        valid_params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'paymentamount': payment_amount,
+            'paymentschedule': params['paymentschedule']
+        }
+        return valid_params
+
+    def calculate(self, downpayment, askingprice, paymentamount, paymentschedule):
+        # Return:
+        #   Years (and number of payments) until the mortgage is paid off,
+        #   along with the solver's iteration count and residual
+
+        insurance = insurance_rate(downpayment, askingprice)
+        L = (askingprice - downpayment) * (1 + insurance)
+        payments_per_year = PAYMENTS_PER_YEAR[paymentschedule]
+        c = self.rate_per_year / RATE_PERIODS_PER_YEAR[paymentschedule]
+
+        periods, iterations, residual, converged = solve_periods(
+            L, c, paymentamount, MAX_YEARS * payments_per_year, max_iterations=MAX_ITERATIONS)
+        if np.isnan(periods):
+            self.errors.append("paymentamount too low to pay off the mortgage within {} years".format(MAX_YEARS))
+            raise ValueError()
+        if not converged:
+            self.errors.append("amortizationperiod did not converge within {} iterations".format(MAX_ITERATIONS))
+            raise ValueError()
+
+        return {
+            'amortizationperiod': float(periods / payments_per_year),
+            'payments': int(np.ceil(periods - 1e-6)),
+            'iterations': int(iterations),
+            'residual': float(residual),
+        }
+
+    def get(self, request):
+        try:
+            raw_params = self.decode_params(request)
+            self.params = self.validate(raw_params)
+            result = self.calculate(**self.params)
+        except:
+            # Log exceptions here
+            return self.error_response(self.errors)
+
+        if self.errors:
+            return self.error_response(self.errors)
+        return self.success_response(result)
@@ -0,0 +1,168 @@
+import numpy as np
+from django.http import HttpResponseNotAllowed
+from calculator.rendering import render_success, render_error
+from calculator.coalescing import coalesce
+from calculator.amortization import PAYMENTS_PER_YEAR, RATE_PERIODS_PER_YEAR, minimum_down_payment, insurance_rate
+from calculator.solver import MAX_ITERATIONS, solve_rate
+
+
+@coalesce
+def request(request):
+    # Methods accepted:
+    #   GET
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(permitted_methods=['GET'])
+
+    # the rate is what's being solved for, so the current rate isn't needed
+    implied_rate = ImpliedRateView()
+    return implied_rate.get(request)
+
+
+class ImpliedRateView:
+    def __init__(self):
+        self.operation = "Implied Rate"
+        self.params = {}
+        self.errors = []
+
+    def error_response(self, errors):
+        return render_error(self.operation, self.params, errors)
+
+    def success_response(self, response):
+        return render_success(self.operation, self.params, response)
+
+    def decode_params(self, request):
+        # Expected parameters:
+        #   askingprice: float
+        #   downpayment: float
+        #   paymentamount: float
+        #   paymentschedule: (weekly | biweekly | monthly),
+        #   amortizationperiod: float
+
+        # extract variables
+        asking_price = request.GET.get('askingprice', None)
+        down_payment = request.GET.get('downpayment', None)
+        payment_amount = request.GET.get('paymentamount', None)
+        payment_schedule = request.GET.get('paymentschedule', '').lower()
+        amortization_period = request.GET.get('amortizationperiod', None)
+
+        # required parameters were present
+        if asking_price is None:
+            self.errors.append("missing parameter 'askingprice'")
+        if down_payment is None:
+            self.errors.append("missing parameter 'downpayment'")
+        if payment_amount is None:
+            self.errors.append("missing parameter 'paymentamount'")
+        if not payment_schedule:
+            self.errors.append("missing parameter 'paymentschedule'")
+        if amortization_period is None:
+            self.errors.append("missing parameter 'amortizationperiod'")
+
+        if self.errors:
+            raise ValueError()
+
+        params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'paymentamount': payment_amount,
+            'paymentschedule': payment_schedule,
+            'amortizationperiod': amortization_period
+        }
+        return params
+
+    def validate(self, params):
+        # Validation:
+        #   downpayment must be at least 5% of the first $500k plus 10% of any amount above $500k (so $50k on a $750k mortgage)
+        #   paymentamount must be positive
+        #   paymentschedule must be 'weekly', 'biweekly', or 'monthly'
+        #   amortizationperiod must be between 5 and 25 years. Expressed as years
+
+        # validate asking price and potentially exit early
+        try:
+            asking_price = float(params['askingprice'])
+        except:
+            self.errors.append("askingprice must be a number")
+            raise ValueError()
+
+        # validate down payment
+        try:
+            down_payment = float(params['downpayment'])
+        except:
+            self.errors.append("downpayment must be a number")
+            down_payment = 0
+        else:
+            min_down = minimum_down_payment(asking_price)
+            if down_payment < min_down:
+                self.errors.append("downpayment too low for askingprice. Must be at least ${}".format(min_down))
+
+        # validate payment amount
+        try:
+            payment_amount = float(params['paymentamount'])
+        except:
+            self.errors.append("paymentamount must be a number")
+            payment_amount = 0
+        else:
+            if not payment_amount > 0:
+                self.errors.append("paymentamount must be positive")
+
+        # validate payment schedule
+        if params['paymentschedule'] not in ('weekly', 'biweekly', 'monthly'):
+            self.errors.append("paymentschedule must be one of 'weekly', 'biweekly', or 'monthly'")
+
+        # validate amortization period
+        try:
+            amortization_period = float(params['amortizationperiod'])
+        except:
+            self.errors.append("amortizationperiod must be a number")
+            amortization_period = 0
+        else:
+            if not (5 <= amortization_period <= 25):
+                self.errors.append("amortizationperiod must be between 5 and 25 years")
+
+        if self.errors:
+            raise ValueError()
+        valid_params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'paymentamount': payment_amount,
+            'paymentschedule': params['paymentschedule'],
+            'amortizationperiod': amortization_period
+        }
+        return valid_params
+
+    def calculate(self, downpayment, askingprice, paymentamount, paymentschedule, amortizationperiod):
+        # Return:
+        #   Nominal and effective annual interest rates implied by the payment amount,
+        #   along with the solver's iteration count and residual
+
+        insurance = insurance_rate(downpayment, askingprice)
+        L = (askingprice - downpayment) * (1 + insurance)
+        payments_per_year = PAYMENTS_PER_YEAR[paymentschedule]
+        payments = round(amortizationperiod * payments_per_year)
+
+        c, iterations, residual, converged = solve_rate(L, paymentamount, payments, max_iterations=MAX_ITERATIONS)
+        if np.isnan(c):
+            self.errors.append("paymentamount too low to imply a positive interest rate")
+            raise ValueError()
+        if not converged:
+            self.errors.append("interest rate did not converge within {} iterations".format(MAX_ITERATIONS))
+            raise ValueError()
+
+        return {
+            'nominal_rate': float(c * RATE_PERIODS_PER_YEAR[paymentschedule]),
+            'effective_rate': float(np.expm1(payments_per_year * np.log1p(c))),
+            'iterations': int(iterations),
+            'residual': float(residual),
+        }
+
+    def get(self, request):
+        try:
+            raw_params = self.decode_params(request)
+            self.params = self.validate(raw_params)
+            result = self.calculate(**self.params)
+        except:
+            # Log exceptions here
+            return self.error_response(self.errors)
+
+        if self.errors:
+            return self.error_response(self.errors)
+        return self.success_response(result)
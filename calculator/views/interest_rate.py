@@ -1,8 +1,9 @@
 from decimal import Decimal
 import json
-from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.http import HttpResponseNotAllowed
 from django.utils import timezone
 from calculator.models import InterestRate
+from calculator.rendering import render_success, render_error
 
 
 def request(request):
@@ -25,29 +26,15 @@ class InterestRateView:
         self.errors = []
 
     def error_response(self, errors):
-        response_data = {
-            'result': 'error',
-            'request': self.operation,
-            'request_params': self.params,
-            'errors': errors
-        }
-        response = JsonResponse(response_data)
-        response.status_code = 400  # Bad Request
-        return response
+        return render_error(self.operation, self.params, errors)
 
     def success_response(self, response):
         # Return:
         #   message including old and new interest rates
-        response_data = {
-            'result': 'success',
-            'request': self.operation,
-            'request_params': self.params,
-            'response': {
-                'old_rate': str(self.rate_per_year),
-                'new_rate': response
-            }
-        }
-        return JsonResponse(response_data)
+        return render_success(self.operation, self.params, {
+            'old_rate': str(self.rate_per_year),
+            'new_rate': response
+        })
 
     def decode_params(self, request):
         # Expected parameters:
@@ -1,8 +1,12 @@
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponseNotAllowed
+from django.http import HttpResponseNotAllowed
 from calculator.models import InterestRate
+from calculator.rendering import render_success, render_error
+from calculator.coalescing import coalesce
+from calculator.amortization import PAYMENTS_PER_YEAR, RATE_PERIODS_PER_YEAR
 
 
+@coalesce
 def request(request):
     # Methods accepted:
     #   GET
@@ -23,24 +27,10 @@ class MortgageAmountView:
         self.errors = []
 
     def error_response(self, errors):
-        response_data = {
-            'result': 'error',
-            'request': self.operation,
-            'request_params': self.params,
-            'errors': errors
-        }
-        response = JsonResponse(response_data)
-        response.status_code = 400  # Bad Request
-        return response
+        return render_error(self.operation, self.params, errors)
 
     def success_response(self, response):
-        response_data = {
-            'result': 'success',
-            'request': self.operation,
-            'request_params': self.params,
-            'response': response
-        }
-        return JsonResponse(response_data)
+        return render_success(self.operation, self.params, response)
 
     def decode_params(self, request):
         # Expected parameters:
@@ -123,15 +113,9 @@ class MortgageAmountView:
         # Return:
         #   Maximum mortgage that can be taken out
 
-        if paymentschedule == 'weekly':
-            total_payments = int(round(amortizationperiod * 52.177457))
-            rate_per_period = self.rate_per_year / 52.177457
-        elif paymentschedule == 'biweekly':
-            total_payments = int(round(amortizationperiod * 52.177457 / 2))
-            rate_per_period = self.rate_per_year / 52.177457 / 2
-        else:
-            total_payments = int(round(amortizationperiod * 12))
-            rate_per_period = self.rate_per_year / 12
+        payments_per_year = PAYMENTS_PER_YEAR[paymentschedule]
+        total_payments = int(round(amortizationperiod * payments_per_year))
+        rate_per_period = self.rate_per_year / RATE_PERIODS_PER_YEAR[paymentschedule]
 
         # payment formula: P = L[c(1 + c)^n]/[(1 + c)^n - 1]
         c = rate_per_period
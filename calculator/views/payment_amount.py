@@ -1,8 +1,15 @@
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponseNotAllowed
+from django.http import HttpResponseNotAllowed
 from calculator.models import InterestRate
+from calculator.rendering import render_success, render_error
+from calculator.coalescing import coalesce
+from calculator.amortization import (
+    PAYMENTS_PER_YEAR, RATE_PERIODS_PER_YEAR, EXACT_RATE_PERIODS_PER_YEAR, RENEWAL_TERM, minimum_down_payment, insurance_rate, level_payment, loan_summary)
+from calculator.fixed_point import (
+    RATE_SCALE, amortize_loan, divide_half_even, fits_int64, from_cents, period_rate, to_cents, to_fixed_rate)
 
 
+@coalesce
 def request(request):
     # Methods accepted:
     #   GET
@@ -23,24 +30,10 @@ class PaymentAmountView:
         self.errors = []
 
     def error_response(self, errors):
-        response_data = {
-            'result': 'error',
-            'request': self.operation,
-            'request_params': self.params,
-            'errors': errors
-        }
-        response = JsonResponse(response_data)
-        response.status_code = 400  # Bad Request
-        return response
+        return render_error(self.operation, self.params, errors)
 
     def success_response(self, response):
-        response_data = {
-            'result': 'success',
-            'request': self.operation,
-            'request_params': self.params,
-            'response': response
-        }
-        return JsonResponse(response_data)
+        return render_success(self.operation, self.params, response)
 
     def decode_params(self, request):
         # Expected parameters:
@@ -48,12 +41,16 @@ class PaymentAmountView:
         #   downpayment: float
         #   paymentschedule: (weekly | biweekly | monthly),
         #   amortizationperiod: float
+        #   summary: (true | false) (optional)
+        #   mode: (float | fixed) (optional)
 
         # extract variables
         askingPrice = request.GET.get('askingprice', None)
         downPayment = request.GET.get('downpayment', None)
         paymentSchedule = request.GET.get('paymentschedule', '').lower()
         amortizationPeriod = request.GET.get('amortizationperiod', None)
+        summary = request.GET.get('summary', 'false').lower()
+        mode = request.GET.get('mode', 'float').lower()
 
         # required parameters were present
         if askingPrice is None:
@@ -72,7 +69,9 @@ class PaymentAmountView:
             'askingprice': askingPrice,
             'downpayment': downPayment,
             'paymentschedule': paymentSchedule,
-            'amortizationperiod': amortizationPeriod
+            'amortizationperiod': amortizationPeriod,
+            'summary': summary,
+            'mode': mode
         }
         return params
 
@@ -96,10 +95,7 @@ class PaymentAmountView:
             self.errors.append("downpayment must be a number")
             downPayment = 0
         else:
-            min_down = askingPrice * 0.05
-            if askingPrice > 500000:
-                min_down += (askingPrice - 500000) * 0.1
-
+            min_down = minimum_down_payment(askingPrice)
             if downPayment < min_down:
                 self.errors.append("downpayment too low for askingprice. Must be at least ${}".format(min_down))
 
@@ -117,6 +113,14 @@ class PaymentAmountView:
             if not (5 <= amortizationPeriod <= 25):
                 self.errors.append("amortizationperiod must be between 5 and 25 years")
 
+        # validate summary
+        if params['summary'] not in ('true', 'false'):
+            self.errors.append("summary must be one of 'true' or 'false'")
+
+        # validate mode
+        if params['mode'] not in ('float', 'fixed'):
+            self.errors.append("mode must be one of 'float' or 'fixed'")
+
         if self.errors:
             raise ValueError()
         valid_params = {
@@ -125,41 +129,75 @@ class PaymentAmountView:
             'paymentschedule': params['paymentschedule'],
             'amortizationperiod': amortizationPeriod
         }
+        # only echo summary and mode when asked for, so plain requests are unchanged
+        if params['summary'] == 'true':
+            valid_params['summary'] = True
+        if params['mode'] == 'fixed':
+            valid_params['mode'] = 'fixed'
         return valid_params
 
-    def calculate(self, downpayment, askingprice, paymentschedule, amortizationperiod):
+    def calculate(self, downpayment, askingprice, paymentschedule, amortizationperiod, summary=False, mode='float'):
         # Return:
         #   Payment amount per scheduled payment
+        #   or, with summary, the payment amount along with loan totals
+        if mode == 'fixed':
+            return self.calculate_fixed(downpayment, askingprice, paymentschedule, amortizationperiod, summary)
 
-        down_percent = downpayment / askingprice
-        if down_percent < 0.1:
-            insurance_rate = 0.0315
-        elif down_percent < 0.15:
-            insurance_rate = 0.024
-        elif down_percent < 0.2:
-            insurance_rate = 0.018
-        else:
-            insurance_rate = 0
-        # no insurance for mortgages over 1 million
-        if (askingprice - downpayment) > 1e6:
-            insurance_rate = 0
-
-        if paymentschedule == 'weekly':
-            payments = int(round(amortizationperiod * 52.177457))
-            rate_per_period = self.rate_per_year / 52.177457
-        elif paymentschedule == 'biweekly':
-            payments = int(round(amortizationperiod * 52.177457 / 2))
-            rate_per_period = self.rate_per_year / 52.177457 / 2
-        else:
-            payments = int(round(amortizationperiod * 12))
-            rate_per_period = self.rate_per_year / 12
+        insurance = insurance_rate(downpayment, askingprice)
+
+        payments_per_year = PAYMENTS_PER_YEAR[paymentschedule]
+        payments = int(round(amortizationperiod * payments_per_year))
+        rate_per_period = self.rate_per_year / RATE_PERIODS_PER_YEAR[paymentschedule]
 
         # payment formula: P = L[c(1 + c)^n]/[(1 + c)^n - 1]
         c = rate_per_period
-        L = (askingprice - downpayment) * (1 + insurance_rate)
+        L = (askingprice - downpayment) * (1 + insurance)
         n = payments
         payment = L * (c * (1 + c) ** n) / ((1 + c) ** n - 1)
-        return payment
+        if not summary:
+            return payment
+
+        # closed form totals, so the schedule never has to be built
+        totals = loan_summary(L, c, payment, n, payments_per_year)
+        totals['payment'] = payment
+        totals['total_insurance'] = (askingprice - downpayment) * insurance
+        return totals
+
+    def calculate_fixed(self, downpayment, askingprice, paymentschedule, amortizationperiod, summary=False):
+        # Return:
+        #   Payment amount per scheduled payment, in exact cents
+        #   or, with summary, the payment amount along with loan totals
+        # Amounts are integer cents and the rate a fixed scale integer. Interest is
+        # rounded half to even every period, and the final payment clears the balance.
+
+        insurance = insurance_rate(downpayment, askingprice)
+        loan = to_cents(askingprice) - to_cents(downpayment)
+        premium = int(divide_half_even(loan * to_fixed_rate(insurance), RATE_SCALE))
+        L = loan + premium
+
+        # same schedules as calculate()
+        payments = int(round(amortizationperiod * PAYMENTS_PER_YEAR[paymentschedule]))
+        numerator, denominator = period_rate(
+            to_fixed_rate(self.rate_per_year), EXACT_RATE_PERIODS_PER_YEAR[paymentschedule])
+        if not fits_int64(L, numerator):
+            self.errors.append("mortgage too large for mode 'fixed'")
+            raise ValueError()
+        n = payments
+        payment = int(round(float(level_payment(L, numerator / denominator, n))))
+        if not summary:
+            return str(from_cents(payment))
+
+        payments_per_year = PAYMENTS_PER_YEAR[paymentschedule]
+        renewal_period = min(round(RENEWAL_TERM * payments_per_year), n)
+        totals = amortize_loan(L, numerator, denominator, payment, n, payments_per_year, renewal_period)
+        return {
+            'payment': str(from_cents(payment)),
+            'final_payment': str(from_cents(totals['final_payment'])),
+            'total_interest': str(from_cents(totals['total_interest'])),
+            'interest_by_year': [str(from_cents(interest)) for interest in totals['interest_by_year']],
+            'total_insurance': str(from_cents(premium)),
+            'renewal_balance': str(from_cents(totals['renewal_balance'])),
+        }
 
     def get(self, request):
         try:
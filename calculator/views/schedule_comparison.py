@@ -0,0 +1,163 @@
+import numpy as np
+from django.utils import timezone
+from django.http import HttpResponseNotAllowed
+from calculator.models import InterestRate
+from calculator.rendering import render_success, render_error
+from calculator.coalescing import coalesce
+from calculator.amortization import (
+    PAYMENTS_PER_YEAR, minimum_down_payment, insurance_rate, level_payment, payoff_summary)
+
+# Schedules compared side by side, as (name, payments per year).
+# Accelerated schedules pay a quarter (weekly) or half (biweekly) of the
+# monthly payment, which pays the mortgage off early.
+SCHEDULES = (
+    ('weekly', PAYMENTS_PER_YEAR['weekly']),
+    ('biweekly', PAYMENTS_PER_YEAR['biweekly']),
+    ('monthly', PAYMENTS_PER_YEAR['monthly']),
+    ('accelerated_weekly', PAYMENTS_PER_YEAR['weekly']),
+    ('accelerated_biweekly', PAYMENTS_PER_YEAR['biweekly']),
+)
+MONTHLY = 2
+ACCELERATED_WEEKLY = 3
+ACCELERATED_BIWEEKLY = 4
+
+
+@coalesce
+def request(request):
+    # Methods accepted:
+    #   GET
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(permitted_methods=['GET'])
+
+    now = timezone.now()
+    rate_per_year = float(InterestRate.get_rate_at_time(now))
+    schedule_comparison = ScheduleComparisonView(rate_per_year)
+    return schedule_comparison.get(request)
+
+
+class ScheduleComparisonView:
+    def __init__(self, interest_rate):
+        self.operation = "Schedule Comparison"
+        self.params = {}
+        self.rate_per_year = interest_rate
+        self.errors = []
+
+    def error_response(self, errors):
+        return render_error(self.operation, self.params, errors)
+
+    def success_response(self, response):
+        return render_success(self.operation, self.params, response)
+
+    def decode_params(self, request):
+        # Expected parameters:
+        #   askingprice: float
+        #   downpayment: float
+        #   amortizationperiod: float
+
+        # extract variables
+        asking_price = request.GET.get('askingprice', None)
+        down_payment = request.GET.get('downpayment', None)
+        amortization_period = request.GET.get('amortizationperiod', None)
+
+        # required parameters were present
+        if asking_price is None:
+            self.errors.append("missing parameter 'askingprice'")
+        if down_payment is None:
+            self.errors.append("missing parameter 'downpayment'")
+        if amortization_period is None:
+            self.errors.append("missing parameter 'amortizationperiod'")
+
+        if self.errors:
+            raise ValueError()
+
+        params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'amortizationperiod': amortization_period
+        }
+        return params
+
+    def validate(self, params):
+        # Validation:
+        #   downpayment must be at least 5% of the first $500k plus 10% of any amount above $500k (so $50k on a $750k mortgage)
+        #   amortizationperiod must be between 5 and 25 years. Expressed as years
+
+        # validate asking price and potentially exit early
+        try:
+            asking_price = float(params['askingprice'])
+        except:
+            self.errors.append("askingprice must be a number")
+            raise ValueError()
+
+        # validate down payment
+        try:
+            down_payment = float(params['downpayment'])
+        except:
+            self.errors.append("downpayment must be a number")
+            down_payment = 0
+        else:
+            min_down = minimum_down_payment(asking_price)
+            if down_payment < min_down:
+                self.errors.append("downpayment too low for askingprice. Must be at least ${}".format(min_down))
+
+        # validate amortization period
+        try:
+            amortization_period = float(params['amortizationperiod'])
+        except:
+            self.errors.append("amortizationperiod must be a number")
+            amortization_period = 0
+        else:
+            if not (5 <= amortization_period <= 25):
+                self.errors.append("amortizationperiod must be between 5 and 25 years")
+
+        if self.errors:
+            raise ValueError()
+        valid_params = {
+            'askingprice': asking_price,
+            'downpayment': down_payment,
+            'amortizationperiod': amortization_period
+        }
+        return valid_params
+
+    def calculate(self, downpayment, askingprice, amortizationperiod):
+        # Return:
+        #   For every payment schedule: the payment amount, total interest paid,
+        #   and the number of payments and years until the mortgage is paid off.
+
+        # insurance and principal are shared by every schedule
+        insurance = insurance_rate(downpayment, askingprice)
+        L = (askingprice - downpayment) * (1 + insurance)
+
+        payments_per_year = np.array([per_year for name, per_year in SCHEDULES])
+        rate_per_period = self.rate_per_year / payments_per_year
+        payments = np.round(amortizationperiod * payments_per_year)
+
+        payment = level_payment(L, rate_per_period, payments)
+        payment[ACCELERATED_WEEKLY] = payment[MONTHLY] / 4
+        payment[ACCELERATED_BIWEEKLY] = payment[MONTHLY] / 2
+
+        periods, total_interest = payoff_summary(L, rate_per_period, payment)
+        payoff_years = periods / payments_per_year
+
+        comparison = {}
+        for i, (name, per_year) in enumerate(SCHEDULES):
+            comparison[name] = {
+                'payment': float(payment[i]),
+                'total_interest': float(total_interest[i]),
+                'payments': int(periods[i]),
+                'payoff_years': float(payoff_years[i]),
+            }
+        return comparison
+
+    def get(self, request):
+        try:
+            raw_params = self.decode_params(request)
+            self.params = self.validate(raw_params)
+            result = self.calculate(**self.params)
+        except:
+            # Log exceptions here
+            return self.error_response(self.errors)
+
+        if self.errors:
+            return self.error_response(self.errors)
+        return self.success_response(result)